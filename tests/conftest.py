@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules of the tagger import each other as top level modules
+sys.path.append(str(Path(__file__).parent.parent / "tk_tagger"))
@@ -0,0 +1,47 @@
+from consensus import annotation_paths, find_annotated_images
+
+
+def touch(directory, *names):
+    for name in names:
+        (directory / name).write_text("")
+
+
+def test_annotators_of_images_with_a_common_stem(tmp_path):
+    touch(
+        tmp_path,
+        "fire1.jpg",
+        "fire1.v2.jpg",
+        "fire1.a.cells.txt",
+        "fire1.b.cells.txt",
+        "fire1.v2.a.cells.txt",
+        "fire1.v2.b.cells.txt",
+        "fire1.cells.txt",
+        "fire1.v2.cells.txt",
+    )
+
+    assert annotation_paths(tmp_path / "fire1.jpg") == [
+        tmp_path / "fire1.a.cells.txt",
+        tmp_path / "fire1.b.cells.txt",
+    ]
+    assert annotation_paths(tmp_path / "fire1.v2.jpg") == [
+        tmp_path / "fire1.v2.a.cells.txt",
+        tmp_path / "fire1.v2.b.cells.txt",
+    ]
+
+
+def test_find_annotated_images_needs_two_annotators(tmp_path):
+    touch(
+        tmp_path,
+        "fire1.jpg",
+        "fire1.v2.jpg",
+        "fire1.a.cells.txt",
+        "fire1.v2.a.cells.txt",
+        "fire1.v2.b.cells.txt",
+    )
+
+    assert find_annotated_images([tmp_path]) == [
+        (
+            tmp_path / "fire1.v2.jpg",
+            [tmp_path / "fire1.v2.a.cells.txt", tmp_path / "fire1.v2.b.cells.txt"],
+        )
+    ]
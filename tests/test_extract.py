@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from extract import Manifest, load_manifest, write_manifest
+
+
+def test_manifest_round_trip(tmp_path):
+    shards = [
+        [(Path("/data/a.jpg"), Path("/data/a.cells.txt"))],
+        [(Path("/data/b.jpg"), Path("/data/b.cells.txt"))],
+    ]
+    manifest = Manifest(shards, {"FIRE": 0.5, "SMOKE": 1.0}, 7)
+    path = tmp_path / "manifest.json"
+
+    write_manifest(path, manifest)
+
+    assert load_manifest(path) == manifest
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_missing_manifest(tmp_path):
+    assert load_manifest(tmp_path / "manifest.json") is None
@@ -0,0 +1,137 @@
+import pytest
+
+import regrid
+from cell import CellType
+from state import CellStates
+
+COLUMNS, ROWS = 10, 6
+
+
+def make_cells(columns, rows):
+    types = list(CellType)
+    cells = CellStates()
+    cells.update(
+        {
+            (column, row): types[(column * 3 + row) % len(types)]
+            for column in range(columns)
+            for row in range(rows)
+        }
+    )
+    return cells
+
+
+def cells_from(rows):
+    cells = CellStates()
+    cells.update(
+        {
+            (column, row): t
+            for row, types in enumerate(rows)
+            for column, t in enumerate(types)
+        }
+    )
+    return cells
+
+
+def test_same_grid_keeps_cells():
+    cells = make_cells(COLUMNS, ROWS)
+
+    result = regrid.resample(
+        cells, (7, 3), 50, (COLUMNS, ROWS), (7, 3), 50, (COLUMNS, ROWS)
+    )
+
+    assert result == cells
+
+
+def test_half_cell_size_splits_cells():
+    cells = make_cells(COLUMNS, ROWS)
+
+    result = regrid.resample(
+        cells, (7, 3), 50, (COLUMNS, ROWS), (7, 3), 25, (COLUMNS * 2, ROWS * 2)
+    )
+
+    assert len(result) == COLUMNS * ROWS * 4
+    for (column, row), t in result.items():
+        assert t == cells[(column // 2, row // 2)]
+
+
+def test_split_and_merge_round_trip():
+    cells = make_cells(COLUMNS, ROWS)
+
+    split = regrid.resample(
+        cells, (7, 3), 50, (COLUMNS, ROWS), (7, 3), 25, (COLUMNS * 2, ROWS * 2)
+    )
+    merged = regrid.resample(
+        split, (7, 3), 25, (COLUMNS * 2, ROWS * 2), (7, 3), 50, (COLUMNS, ROWS)
+    )
+
+    assert merged == cells
+
+
+def test_offset_shift_takes_the_most_overlapped_cell():
+    fire, smoke = CellType.FIRE, CellType.SMOKE
+    cells = cells_from([[fire, smoke, fire]])
+
+    # Each new cell covers 40px of the old cell below it and 10px of the next
+    result = regrid.resample(cells, (0, 0), 50, (3, 1), (10, 0), 50, (3, 1))
+
+    assert [result[(column, 0)] for column in range(3)] == [fire, smoke, fire]
+
+    # Shifted past the middle, the next old cell covers most of each new cell
+    result = regrid.resample(cells, (0, 0), 50, (3, 1), (30, 0), 50, (2, 1))
+
+    assert [result[(column, 0)] for column in range(2)] == [smoke, fire]
+
+
+def test_any_fire_rule():
+    other, fire = CellType.OTHER, CellType.FIRE
+    cells = cells_from([[other, fire], [other, other]])
+
+    majority = regrid.resample(cells, (0, 0), 25, (2, 2), (0, 0), 50, (1, 1))
+    any_fire = regrid.resample(
+        cells, (0, 0), 25, (2, 2), (0, 0), 50, (1, 1), regrid.RULE_ANY_FIRE
+    )
+
+    assert majority[(0, 0)] == other
+    assert any_fire[(0, 0)] == fire
+
+
+@pytest.mark.parametrize(
+    "min_coverage, expected", [(0.25, CellType.SMOKE), (0.5, CellType.IGNORE)]
+)
+def test_coverage_rule(min_coverage, expected):
+    ignore, smoke = CellType.IGNORE, CellType.SMOKE
+    cells = cells_from([[smoke, ignore], [ignore, ignore]])
+
+    result = regrid.resample(
+        cells,
+        (0, 0),
+        25,
+        (2, 2),
+        (0, 0),
+        50,
+        (1, 1),
+        regrid.RULE_COVERAGE,
+        min_coverage,
+    )
+
+    assert result[(0, 0)] == expected
+
+
+def test_output_targets_keep_relative_paths(tmp_path):
+    for directory in ["in/a", "in/b", "other"]:
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / "fire1.jpg").write_text("")
+        (tmp_path / directory / "fire1.cells.txt").write_text("")
+
+    output = tmp_path / "out"
+    targets = regrid.output_targets([str(tmp_path / "in")], output)
+
+    assert sorted(target for _, _, target in targets) == [
+        output / "a" / "fire1.cells.txt",
+        output / "b" / "fire1.cells.txt",
+    ]
+
+    with pytest.raises(ValueError):
+        regrid.output_targets(
+            [str(tmp_path / "in" / "a"), str(tmp_path / "other")], output
+        )
@@ -0,0 +1,131 @@
+import pytest
+
+from state import StateData, TransitionType
+
+CELL_SIZE = 50
+INITIAL_WIDTH, INITIAL_HEIGHT = 1037, 733
+REAL_WIDTH, REAL_HEIGHT = 600, 424
+
+
+@pytest.fixture
+def state():
+    state = StateData(CELL_SIZE, INITIAL_WIDTH, INITIAL_HEIGHT)
+    state.reduce_mut((TransitionType.RESIZE_IMAGE, (REAL_WIDTH, REAL_HEIGHT)))
+    state.offset_x = 20
+    state.offset_y = 30
+    return state
+
+
+def assert_geometry(state, cell_size, offset_x, offset_y):
+    """
+    Compare the cached geometry with the math of the former properties
+    """
+    width_ratio = REAL_WIDTH / INITIAL_WIDTH
+    height_ratio = REAL_HEIGHT / INITIAL_HEIGHT
+    real_cell_size = width_ratio * cell_size
+    rows = INITIAL_HEIGHT // cell_size
+    columns = INITIAL_WIDTH // cell_size
+
+    geometry = state.geometry
+    assert geometry.width_ratio == pytest.approx(width_ratio)
+    assert geometry.height_ratio == pytest.approx(height_ratio)
+    assert geometry.inverse_width_ratio == pytest.approx(INITIAL_WIDTH / REAL_WIDTH)
+    assert geometry.inverse_height_ratio == pytest.approx(INITIAL_HEIGHT / REAL_HEIGHT)
+    assert geometry.real_cell_size == pytest.approx(real_cell_size)
+    assert geometry.real_offset_x == pytest.approx(offset_x * width_ratio)
+    assert geometry.real_offset_y == pytest.approx(offset_y * height_ratio)
+    assert geometry.max_offset_x == INITIAL_WIDTH % cell_size
+    assert geometry.max_offset_y == INITIAL_HEIGHT % cell_size
+    assert geometry.rows == rows
+    assert geometry.columns == columns
+
+    assert len(geometry.column_origins) == columns + 1
+    for x, origin in enumerate(geometry.column_origins):
+        assert origin == pytest.approx(x * real_cell_size + offset_x * width_ratio)
+
+    assert len(geometry.row_origins) == rows + 1
+    for y, origin in enumerate(geometry.row_origins):
+        assert origin == pytest.approx(y * real_cell_size + offset_y * height_ratio)
+
+    assert state.rows == rows
+    assert state.columns == columns
+    assert state.real_cell_size == pytest.approx(real_cell_size)
+
+
+def test_geometry_matches_property_math(state):
+    assert_geometry(state, CELL_SIZE, 20, 30)
+
+
+def test_all_real_cells_use_origins(state):
+    width_ratio = REAL_WIDTH / INITIAL_WIDTH
+    height_ratio = REAL_HEIGHT / INITIAL_HEIGHT
+    real_cell_size = width_ratio * CELL_SIZE
+
+    for (real_x, real_y, _), (x, y, _) in zip(state.all_real_cells, state.all_cells):
+        assert real_x == pytest.approx(x * real_cell_size + 20 * width_ratio)
+        assert real_y == pytest.approx(y * real_cell_size + 30 * height_ratio)
+
+
+def test_offset_assignment_refreshes_geometry(state):
+    state.offset_x = 7
+    state.offset_y = 11
+
+    assert_geometry(state, CELL_SIZE, 7, 11)
+
+
+def test_drag_grid_refreshes_geometry(state):
+    state.reduce_mut((TransitionType.DRAG_GRID_PRESS, (100, 100)))
+    state.reduce_mut((TransitionType.DRAG_GRID, (90, 95)))
+    state.reduce_mut((TransitionType.DRAG_GRID_RELEASE, (90, 95)))
+
+    assert (state.offset_x, state.offset_y) != (20, 30)
+    assert_geometry(state, CELL_SIZE, state.offset_x, state.offset_y)
+
+
+def test_cell_size_assignment_refreshes_geometry(state):
+    state.cell_size = 25
+
+    assert state.columns == INITIAL_WIDTH // 25
+    assert_geometry(state, 25, 20, 30)
+
+
+def draw_lasso(state, points):
+    state.reduce_mut((TransitionType.PRESS, points[0]))
+    for point in points[1:]:
+        state.reduce_mut((TransitionType.DRAG, point))
+    state.reduce_mut((TransitionType.LASSO_RELEASE, points[-1]))
+
+
+def test_lasso_fills_in_a_single_undo_entry(state):
+    state.reduce_mut((TransitionType.TOGGLE_LASSO, None))
+    draw_lasso(state, [(50, 50), (300, 50), (300, 200), (50, 200)])
+
+    assert len(state.cell_state_handler.prev_states) == 2
+    assert state.cell_brush in state.cell_state.values()
+    assert state.lasso_points == []
+
+
+def test_lasso_without_changes_keeps_undo_history(state):
+    state.reduce_mut((TransitionType.TOGGLE_LASSO, None))
+    draw_lasso(state, [(100, 100)])
+
+    assert len(state.cell_state_handler.prev_states) == 1
+    assert state.lasso_points == []
+
+    polygon = [(50, 50), (300, 50), (300, 200), (50, 200)]
+    draw_lasso(state, polygon)
+    draw_lasso(state, polygon)
+
+    assert len(state.cell_state_handler.prev_states) == 2
+
+
+def test_flood_fill_is_a_single_undo_entry(state):
+    state.reduce_mut((TransitionType.MOVE, (100, 100)))
+    state.reduce_mut((TransitionType.FLOOD_FILL, None))
+
+    assert len(state.cell_state_handler.prev_states) == 2
+    assert set(state.cell_state.values()) == {state.cell_brush}
+
+    state.reduce_mut((TransitionType.FLOOD_FILL, None))
+
+    assert len(state.cell_state_handler.prev_states) == 2
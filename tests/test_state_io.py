@@ -0,0 +1,25 @@
+from cell import CellType
+from state import CellStates
+import state_io
+
+
+def test_cell_size_round_trip(tmp_path):
+    target = tmp_path / "image.cells.txt"
+    cells = CellStates()
+    cells.update({(0, 0): CellType.FIRE, (1, 0): CellType.SMOKE})
+
+    state_io.write_cell_states(target, 7, 3, 25, 2, 1, cells)
+    offset_x, offset_y, result, cell_size = state_io.read_cells(target)
+
+    assert (offset_x, offset_y, cell_size) == (7, 3, 25)
+    assert result == cells
+
+
+def test_files_without_cell_size(tmp_path):
+    target = tmp_path / "image.cells.txt"
+    target.write_text("offset,7,3\n0,0,FIRE\n0,1,OTHER\n")
+
+    offset_x, offset_y, result, cell_size = state_io.read_cells(target)
+
+    assert (offset_x, offset_y, cell_size) == (7, 3, None)
+    assert result == {(0, 0): CellType.FIRE, (1, 0): CellType.OTHER}
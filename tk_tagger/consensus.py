@@ -0,0 +1,261 @@
+"""
+Compare the cells of an image tagged by several annotators
+
+The cells of each annotator are stored next to the image as
+`<image>.<annotator>.cells.txt`. The grids of all the annotators are resampled
+to the one of the first annotator, and the majority vote of each cell is
+written to `<image>.cells.txt`, which is the file opened by the tagger.
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from PIL import Image
+
+import dataset
+import options
+import regrid
+from cell import CellType
+from state import CellStates, Coord
+import state_io
+
+
+class Comparison(NamedTuple):
+    offset_x: int
+    offset_y: int
+    cell_size: int
+    columns: int
+    rows: int
+    consensus: CellStates
+    agreement: Dict[Coord, float]
+    confusion: Counter
+
+    @property
+    def contested(self) -> Set[Coord]:
+        return {coord for coord, value in self.agreement.items() if value < 1}
+
+
+def annotation_index(directory: Path) -> Dict[str, List[Path]]:
+    """
+    The annotator files of every image in the directory, by image stem. A file
+    belongs to the image with the longest stem it starts with, so that
+    `fire1.v2.a.cells.txt` is of `fire1.v2.jpg` and not of `fire1.jpg`
+    """
+    image_stems = set()
+    cells_files = []
+
+    for entry in directory.iterdir():
+        if entry.name.endswith(dataset.CELLS_SUFFIX):
+            cells_files.append(entry)
+        elif entry.suffix.lower() in dataset.IMAGE_SUFFIXES:
+            image_stems.add(entry.stem)
+
+    result: Dict[str, List[Path]] = {}
+
+    for cells_file in sorted(cells_files):
+        name = cells_file.name[: -len(dataset.CELLS_SUFFIX)]
+        # The cells file opened by the tagger for an image, not an annotator file
+        if name in image_stems:
+            continue
+
+        parts = name.split(".")
+        # Leave at least one part for the annotator name
+        for end in range(len(parts) - 1, 0, -1):
+            stem = ".".join(parts[:end])
+            if stem in image_stems:
+                result.setdefault(stem, []).append(cells_file)
+                break
+
+    return result
+
+
+def annotation_paths(image: Path) -> List[Path]:
+    return annotation_index(image.parent).get(image.stem, [])
+
+
+def find_annotated_images(roots) -> List[Tuple[Path, List[Path]]]:
+    """
+    Find every image under the given files or directories that was tagged by
+    at least two annotators, with its annotator files
+    """
+    result = []
+    indexes: Dict[Path, Dict[str, List[Path]]] = {}
+
+    for root in roots:
+        root = Path(root)
+        candidates = [root] if root.is_file() else sorted(root.rglob("*"))
+
+        for image in candidates:
+            if image.suffix.lower() not in dataset.IMAGE_SUFFIXES:
+                continue
+
+            if image.parent not in indexes:
+                indexes[image.parent] = annotation_index(image.parent)
+
+            annotations = indexes[image.parent].get(image.stem, [])
+            if len(annotations) >= 2:
+                result.append((image, annotations))
+
+    return result
+
+
+def compare(
+    annotations: List[CellStates],
+    offset: Tuple[int, int],
+    cell_size: int,
+    columns: int,
+    rows: int,
+) -> Comparison:
+    consensus = CellStates()
+    agreement = {}
+    confusion = Counter()
+
+    for row in range(rows):
+        for column in range(columns):
+            labels = [
+                cells.get((column, row), options.DEFAULT_CELL_COLOR)
+                for cells in annotations
+            ]
+
+            votes = Counter(labels)
+            top = max(votes.values())
+            # Ties are resolved in favour of the first annotator
+            consensus[(column, row)] = next(t for t in labels if votes[t] == top)
+            agreement[(column, row)] = top / len(labels)
+
+            for i, a in enumerate(labels):
+                for b in labels[i + 1 :]:
+                    confusion[(a, b)] += 1
+                    confusion[(b, a)] += 1
+
+    return Comparison(
+        *offset, cell_size, columns, rows, consensus, agreement, confusion
+    )
+
+
+def compare_files(
+    cells_files: List[Path],
+    image_size: Tuple[int, int],
+    cell_size: Optional[int] = None,
+    offset: Optional[Tuple[int, int]] = None,
+) -> Comparison:
+    """
+    Compare the cells files in the grid with the given cell size and offset,
+    which default to the ones of the first file
+    """
+    loaded = [state_io.read_cells(cells_file) for cells_file in cells_files]
+    first_x, first_y, _, first_size = loaded[0]
+
+    cell_size = cell_size or first_size or options.CELL_SIZE
+    offset = offset or (first_x, first_y)
+    shape = dataset.grid_shape(*image_size, cell_size)
+
+    annotations = [
+        regrid.resample(
+            cells,
+            (offset_x, offset_y),
+            stored_size or options.CELL_SIZE,
+            dataset.grid_shape(*image_size, stored_size or options.CELL_SIZE),
+            offset,
+            cell_size,
+            shape,
+        )
+        for offset_x, offset_y, cells, stored_size in loaded
+    ]
+
+    return compare(annotations, offset, cell_size, *shape)
+
+
+def process_image(image: Path, cells_files: List[Path], overwrite: bool) -> Dict:
+    with Image.open(image) as src:
+        image_size = src.size
+
+    comparison = compare_files(cells_files, image_size)
+
+    target = dataset.cells_path(image)
+    if overwrite or not target.exists():
+        state_io.write_cell_states(
+            target,
+            comparison.offset_x,
+            comparison.offset_y,
+            comparison.cell_size,
+            comparison.columns,
+            comparison.rows,
+            comparison.consensus,
+        )
+
+    agreement = comparison.agreement.values()
+    return {
+        "image": str(image),
+        "annotators": [str(c) for c in cells_files],
+        "agreement": sum(agreement) / len(agreement) if agreement else 1.0,
+        "contested": len(comparison.contested),
+        "confusion": {
+            f"{a.name},{b.name}": n for (a, b), n in comparison.confusion.items()
+        },
+    }
+
+
+def format_confusion(confusion: Counter) -> str:
+    width = max(len(t.name) for t in CellType) + 2
+    lines = ["".ljust(width) + "".join(t.name.rjust(width) for t in CellType)]
+    for a in CellType:
+        lines.append(
+            a.name.ljust(width)
+            + "".join(str(confusion[(a, b)]).rjust(width) for b in CellType)
+        )
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = ArgumentParser(description="Compare and merge cells of many annotators")
+    parser.add_argument(
+        "inputs", metavar="INPUT", nargs="+", help="Images or directories of images"
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace the cells file of the image if it already exists",
+    )
+    parser.add_argument("--report", default=None, help="Write a JSON report here")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    images = find_annotated_images(args.inputs)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [
+            executor.submit(process_image, image, annotations, args.overwrite)
+            for image, annotations in images
+        ]
+        reports = [future.result() for future in futures]
+
+    confusion = Counter()
+    for report in reports:
+        print(
+            f"{report['image']}: {report['agreement']:.3f} agreement, "
+            f"{report['contested']} contested cells"
+        )
+        for key, n in report["confusion"].items():
+            a, b = key.split(",")
+            confusion[(CellType[a], CellType[b])] += n
+
+    print(format_confusion(confusion))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
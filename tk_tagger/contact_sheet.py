@@ -0,0 +1,168 @@
+"""
+Render the cells of many tagged images into paged contact sheets for review
+
+The overlay of each image is built as a tiny image with one pixel per cell that
+is scaled up to the thumbnail, instead of drawing each cell separately.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image, ImageColor, ImageDraw
+
+import dataset
+import options
+import state_io
+
+PAGE_NAME = "sheet-{:05d}.png"
+PAGE_BACKGROUND = "#202020"
+CAPTION_HEIGHT = 16
+CAPTION_COLOR = "white"
+TILE_PADDING = 4
+
+CELL_RGBA = {
+    t: (*ImageColor.getrgb(color), int(options.CELL_OPACITY * 255))
+    for t, color in options.CELL_COLORS.items()
+}
+
+
+def render_overlay(
+    image_file: Path, cells_file: Path, thumb_size: int, default_cell_size: int
+) -> Image.Image:
+    offset_x, offset_y, cells, cell_size = state_io.read_cells(cells_file)
+    cell_size = cell_size or default_cell_size
+
+    with Image.open(image_file) as src:
+        width, height = src.size
+        # Let the decoder downscale JPEGs while loading, much faster than resizing
+        src.draft("RGB", (thumb_size, thumb_size))
+        thumb = src.convert("RGBA")
+
+    thumb.thumbnail((thumb_size, thumb_size))
+    scale = thumb.width / width
+
+    columns, rows = dataset.grid_shape(width, height, cell_size)
+    if not columns or not rows:
+        return thumb
+
+    labels = Image.new("RGBA", (columns, rows))
+    labels.putdata(
+        [
+            CELL_RGBA[cells.get((column, row), options.DEFAULT_CELL_COLOR)]
+            for row in range(rows)
+            for column in range(columns)
+        ]
+    )
+
+    x_lines = [round((offset_x + c * cell_size) * scale) for c in range(columns + 1)]
+    y_lines = [round((offset_y + r * cell_size) * scale) for r in range(rows + 1)]
+
+    overlay = Image.new("RGBA", thumb.size)
+    overlay.paste(
+        labels.resize(
+            (x_lines[-1] - x_lines[0], y_lines[-1] - y_lines[0]), Image.NEAREST
+        ),
+        (x_lines[0], y_lines[0]),
+    )
+    result = Image.alpha_composite(thumb, overlay)
+
+    draw = ImageDraw.Draw(result)
+    for y in y_lines:
+        draw.line(
+            (x_lines[0], y, x_lines[-1], y),
+            fill=options.CELL_BORDER_COLOR,
+            width=options.CELL_BORDER_WIDTH,
+        )
+    for x in x_lines:
+        draw.line(
+            (x, y_lines[0], x, y_lines[-1]),
+            fill=options.CELL_BORDER_COLOR,
+            width=options.CELL_BORDER_WIDTH,
+        )
+
+    return result
+
+
+def render_page(
+    target: Path,
+    images: List[dataset.TaggedImage],
+    layout: Tuple[int, int],
+    thumb_size: int,
+    default_cell_size: int,
+) -> Path:
+    page_columns, page_rows = layout
+    tile_width = thumb_size + TILE_PADDING
+    tile_height = thumb_size + CAPTION_HEIGHT + TILE_PADDING
+
+    page = Image.new(
+        "RGB",
+        (page_columns * tile_width, page_rows * tile_height),
+        PAGE_BACKGROUND,
+    )
+    draw = ImageDraw.Draw(page)
+
+    for idx, (image_file, cells_file) in enumerate(images):
+        x = (idx % page_columns) * tile_width
+        y = (idx // page_columns) * tile_height
+
+        tile = render_overlay(image_file, cells_file, thumb_size, default_cell_size)
+        page.paste(tile.convert("RGB"), (x, y))
+        draw.text((x, y + thumb_size + 2), image_file.name, fill=CAPTION_COLOR)
+
+    page.save(target)
+    return target
+
+
+def parse_args():
+    parser = ArgumentParser(description="Render contact sheets of tagged images")
+    parser.add_argument(
+        "inputs", metavar="INPUT", nargs="+", help="Images or directories of images"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Directory to write the sheets to"
+    )
+    parser.add_argument(
+        "--thumb-size", type=int, default=256, help="Maximum size of each thumbnail"
+    )
+    parser.add_argument(
+        "--columns", type=int, default=6, help="Thumbnails per row of each sheet"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=5, help="Rows of thumbnails of each sheet"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    images = dataset.find_tagged_images(args.inputs)
+    pages = dataset.chunks(images, args.columns * args.rows)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [
+            executor.submit(
+                render_page,
+                output / PAGE_NAME.format(page_idx),
+                page_images,
+                (args.columns, args.rows),
+                args.thumb_size,
+                options.CELL_SIZE,
+            )
+            for page_idx, page_images in enumerate(pages)
+        ]
+
+        for future in futures:
+            print(future.result())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Helpers to work with a directory of tagged images outside of the tagger
+"""
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+CELLS_SUFFIX = ".cells.txt"
+IMAGE_SUFFIXES = {".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+
+TaggedImage = Tuple[Path, Path]
+
+
+def cells_path(image: Path) -> Path:
+    return image.with_suffix(CELLS_SUFFIX)
+
+
+def find_tagged_images(roots: Iterable[Union[str, Path]]) -> List[TaggedImage]:
+    """
+    Find every image under the given files or directories that has a cells file
+    next to it, sorted so that the result is stable across runs
+    """
+    result = []
+
+    for root in roots:
+        root = Path(root)
+        candidates = [root] if root.is_file() else sorted(root.rglob("*"))
+
+        for image in candidates:
+            if image.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+
+            cells = cells_path(image)
+            if cells.exists():
+                result.append((image, cells))
+
+    return result
+
+
+def grid_shape(width: int, height: int, cell_size: int) -> Tuple[int, int]:
+    return width // cell_size, height // cell_size
+
+
+def cell_box(
+    column: int, row: int, offset_x: int, offset_y: int, cell_size: int
+) -> Tuple[int, int, int, int]:
+    x0 = offset_x + column * cell_size
+    y0 = offset_y + row * cell_size
+    return x0, y0, x0 + cell_size, y0 + cell_size
+
+
+def chunks(items: List, size: int) -> List[List]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
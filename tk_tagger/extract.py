@@ -0,0 +1,259 @@
+"""
+Extract the tagged cells of many images as patches into sharded tar files
+
+Each shard holds the patches of a fixed group of images, stored as a PNG and a
+JSON with its label and source. The groups of images and the sampling are
+stored in a manifest on the first run, and shards are written to a temporary
+name and renamed once complete. So an interrupted run can be resumed by running
+the same command again, even if images were added or removed in the meantime.
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import io
+import json
+import os
+from pathlib import Path
+import random
+import tarfile
+from typing import Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+import dataset
+import options
+from cell import CellType
+import state_io
+
+SHARD_NAME = "shard-{:06d}.tar"
+PARTIAL_SUFFIX = ".partial"
+MANIFEST_NAME = "manifest.json"
+
+
+class Manifest(NamedTuple):
+    shards: List[List[dataset.TaggedImage]]
+    probabilities: Dict[str, float]
+    seed: int
+
+
+def load_manifest(path: Path) -> Optional[Manifest]:
+    if not path.exists():
+        return None
+
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    return Manifest(
+        [
+            [(Path(image), Path(cells)) for image, cells in shard]
+            for shard in manifest["shards"]
+        ],
+        manifest["probabilities"],
+        manifest["seed"],
+    )
+
+
+def write_manifest(path: Path, manifest: Manifest):
+    partial = path.with_name(path.name + PARTIAL_SUFFIX)
+    with open(partial, "w") as f:
+        json.dump(
+            {
+                "shards": [
+                    [[str(image), str(cells)] for image, cells in shard]
+                    for shard in manifest.shards
+                ],
+                "probabilities": manifest.probabilities,
+                "seed": manifest.seed,
+            },
+            f,
+        )
+    partial.replace(path)
+
+
+def count_labels(cells_file: Path) -> Counter:
+    _, _, cells, _ = state_io.read_cells(cells_file)
+    return Counter(t.name for t in cells.values() if t != CellType.IGNORE)
+
+
+def keep_probabilities(
+    counts: Counter, per_class: Optional[int], sample: float
+) -> Dict[str, float]:
+    """
+    Probability of keeping a patch of each label. With per_class, every label
+    is downsampled to roughly the same amount of patches
+    """
+    labels = [t.name for t in CellType if t != CellType.IGNORE]
+
+    if per_class is None:
+        return {label: sample for label in labels}
+
+    return {
+        label: min(1.0, per_class / counts[label]) * sample if counts[label] else 0.0
+        for label in labels
+    }
+
+
+def add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_shard(
+    target: Path,
+    images: List[dataset.TaggedImage],
+    probabilities: Dict[str, float],
+    default_cell_size: int,
+    seed: int,
+) -> Counter:
+    written = Counter()
+    partial = target.with_name(target.name + PARTIAL_SUFFIX)
+
+    with tarfile.open(partial, "w") as tar:
+        for image_idx, (image_file, cells_file) in enumerate(images):
+            offset_x, offset_y, cells, cell_size = state_io.read_cells(cells_file)
+            cell_size = cell_size or default_cell_size
+            # Seeded by image so that a resumed run samples the same patches
+            rng = random.Random(f"{seed}:{image_file.name}")
+
+            with Image.open(image_file) as src:
+                src = src.convert("RGB")
+                columns, rows = dataset.grid_shape(*src.size, cell_size)
+
+                for row in range(rows):
+                    for column in range(columns):
+                        label = cells.get((column, row), options.DEFAULT_CELL_COLOR)
+                        if label == CellType.IGNORE:
+                            continue
+                        if rng.random() >= probabilities[label.name]:
+                            continue
+
+                        box = dataset.cell_box(
+                            column, row, offset_x, offset_y, cell_size
+                        )
+                        patch = io.BytesIO()
+                        src.crop(box).save(patch, format="PNG")
+
+                        key = f"{image_idx:05d}_{row:04d}_{column:04d}"
+                        metadata = {
+                            "image": str(image_file),
+                            "row": row,
+                            "column": column,
+                            "label": label.name,
+                        }
+                        add_bytes(tar, f"{key}.png", patch.getvalue())
+                        add_bytes(tar, f"{key}.json", json.dumps(metadata).encode())
+
+                        written[label.name] += 1
+
+    partial.rename(target)
+    return written
+
+
+def parse_args():
+    parser = ArgumentParser(description="Extract tagged cells into sharded tar files")
+    parser.add_argument(
+        "inputs", metavar="INPUT", nargs="+", help="Images or directories of images"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Directory to write the shards to"
+    )
+    parser.add_argument(
+        "--images-per-shard",
+        type=int,
+        default=256,
+        help="Amount of images whose patches go in each shard",
+    )
+    parser.add_argument(
+        "--per-class",
+        type=int,
+        default=None,
+        help="Balance labels to about this many patches each",
+    )
+    parser.add_argument(
+        "--balanced",
+        action="store_true",
+        help="Balance labels to the amount of patches of the rarest label",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=1.0,
+        help="Fraction of the patches to keep after balancing",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / MANIFEST_NAME
+
+    images = [
+        (image.absolute(), cells.absolute())
+        for image, cells in dataset.find_tagged_images(args.inputs)
+    ]
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        manifest = load_manifest(manifest_path)
+
+        if manifest:
+            known = {image for shard in manifest.shards for image, _ in shard}
+            new = sum(1 for image, _ in images if image not in known)
+            print(f"Resuming from {manifest_path} with its images and sampling")
+            if new:
+                print(f"Ignoring {new} images that are not in the manifest")
+        else:
+            per_class = args.per_class
+            counts = Counter()
+
+            if args.balanced or per_class is not None:
+                for partial_counts in executor.map(
+                    count_labels, [c for _, c in images], chunksize=64
+                ):
+                    counts.update(partial_counts)
+
+                if per_class is None:
+                    per_class = min((n for n in counts.values() if n), default=0)
+
+            manifest = Manifest(
+                dataset.chunks(images, args.images_per_shard),
+                keep_probabilities(counts, per_class, args.sample),
+                args.seed,
+            )
+            write_manifest(manifest_path, manifest)
+
+        futures = []
+        for shard_idx, shard_images in enumerate(manifest.shards):
+            target = output / SHARD_NAME.format(shard_idx)
+            if target.exists():
+                continue
+
+            futures.append(
+                executor.submit(
+                    write_shard,
+                    target,
+                    shard_images,
+                    manifest.probabilities,
+                    options.CELL_SIZE,
+                    manifest.seed,
+                )
+            )
+
+        written = Counter()
+        for future in futures:
+            written.update(future.result())
+
+    print(f"Wrote {len(futures)} of {len(manifest.shards)} shards")
+    for label, amount in sorted(written.items()):
+        print(f"{label}: {amount}")
+
+
+if __name__ == "__main__":
+    main()
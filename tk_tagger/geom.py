@@ -1,3 +1,6 @@
+from collections import defaultdict
+import math
+
 EPSILON = 1e-4
 
 
@@ -92,3 +95,56 @@ def get_circle_grid_overlapping_rects(center, radius, cell_width, cell_height):
         start, end = east_intersections
         for y in range(int(start), int(end) + 1):
             yield east_column, y
+
+
+def get_polygon_grid_cells(
+    points, cell_width, cell_height, columns, rows, samples=1, coverage=0.5
+):
+    """
+    Cells of the grid covered by the polygon, using a scanline fill with
+    samples x samples points per cell. A cell is covered when the fraction of
+    its points inside the polygon is at least coverage, so with a single sample
+    a cell is covered when its center is inside the polygon.
+    """
+    if len(points) < 3:
+        return
+
+    edges = [
+        (x0, y0, x1, y1)
+        for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1])
+        if y0 != y1
+    ]
+
+    north = max(0, int(min(y for _, y in points) // cell_height))
+    south = min(rows - 1, int(max(y for _, y in points) // cell_height))
+
+    step = cell_width / samples
+    total = samples * samples
+
+    for row in range(north, south + 1):
+        counts = defaultdict(int)
+
+        for i in range(samples):
+            y = (row + (i + 0.5) / samples) * cell_height
+
+            # Half open test so that shared vertices are only counted once
+            intersections = sorted(
+                x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+                for x0, y0, x1, y1 in edges
+                if (y0 <= y < y1) or (y1 <= y < y0)
+            )
+
+            for start, end in zip(intersections[::2], intersections[1::2]):
+                # Samples k inside the span, centered at (k + 0.5) * step
+                k = max(0, math.ceil(start / step - 0.5))
+                last = min(columns * samples, math.ceil(end / step - 0.5))
+
+                while k < last:
+                    column = k // samples
+                    next_k = min(last, (column + 1) * samples)
+                    counts[column] += next_k - k
+                    k = next_k
+
+        for column, count in sorted(counts.items()):
+            if count / total >= coverage:
+                yield column, row
@@ -9,6 +9,7 @@ from typing import Dict
 
 from PIL import Image, ImageTk
 
+import consensus
 import options
 from state import CellType, StateData, Transition, TransitionType
 import state_io
@@ -19,10 +20,41 @@ TARGET_FILE = SOURCE_IMG.with_suffix(".cells.txt")
 
 src = Image.open(SOURCE_IMG.absolute())
 src_width, src_height = src.size
-state = StateData(options.CELL_SIZE, src_width, src_height)
 
+stored_cells = None
 if TARGET_FILE.exists():
-    state.offset_x, state.offset_y, state.cell_state = state_io.read_cells(TARGET_FILE)
+    stored_cells = state_io.read_cells(TARGET_FILE)
+    offset_x, offset_y, cell_state, stored_cell_size = stored_cells
+    stored_cell_size = stored_cell_size or options.CELL_SIZE
+
+    if args.cell_size and args.cell_size != stored_cell_size:
+        exit(
+            f"{TARGET_FILE} has cells of size {stored_cell_size}, "
+            f"resample it with regrid.py to use {args.cell_size}"
+        )
+
+state = StateData(
+    args.cell_size or (stored_cells and stored_cell_size) or options.CELL_SIZE,
+    src_width,
+    src_height,
+)
+
+if stored_cells:
+    state.offset_x, state.offset_y, state.cell_state = offset_x, offset_y, cell_state
+
+if args.review and (annotations := consensus.annotation_paths(SOURCE_IMG)):
+    comparison = consensus.compare_files(
+        annotations,
+        (src_width, src_height),
+        state.cell_size,
+        (state.offset_x, state.offset_y) if stored_cells else None,
+    )
+
+    if not stored_cells:
+        state.offset_x, state.offset_y = comparison.offset_x, comparison.offset_y
+        state.cell_state = comparison.consensus
+
+    state.contested_cells = comparison.contested
 
 window = tk.Tk()
 canvas = tk.Canvas()
@@ -73,6 +105,7 @@ CELL_IMAGE_TAG = "CELL_IMAGE_TAG"
 @functools.lru_cache(maxsize=1)
 def display_cells(deps):
     canvas.delete(CELL_IMAGE_TAG)
+    geometry = state.geometry
 
     if state.show_cells:
         for x, y, cell_type in state.all_real_cells:
@@ -84,10 +117,9 @@ def display_cells(deps):
                 tags=CELL_IMAGE_TAG,
             )
 
-    for r in range(0, state.rows + 1):
-        x0 = state.real_offset_x
-        y0 = r * state.real_cell_size + state.real_offset_y
-        x1 = state.columns * state.real_cell_size + state.real_offset_x
+    for y0 in geometry.row_origins:
+        x0 = geometry.column_origins[0]
+        x1 = geometry.column_origins[-1]
         y1 = y0
         canvas.create_line(
             x0,
@@ -99,11 +131,10 @@ def display_cells(deps):
             tags=CELL_IMAGE_TAG,
         )
 
-    for c in range(0, state.columns + 1):
-        x0 = c * state.real_cell_size + state.real_offset_x
-        y0 = state.real_offset_y
+    for x0 in geometry.column_origins:
+        y0 = geometry.row_origins[0]
         x1 = x0
-        y1 = state.rows * state.real_cell_size + state.real_offset_y
+        y1 = geometry.row_origins[-1]
         canvas.create_line(
             x0,
             y0,
@@ -114,6 +145,19 @@ def display_cells(deps):
             tags=CELL_IMAGE_TAG,
         )
 
+    for x, y in state.contested_cells:
+        x0 = geometry.column_origins[x]
+        y0 = geometry.row_origins[y]
+        canvas.create_rectangle(
+            x0,
+            y0,
+            x0 + geometry.real_cell_size,
+            y0 + geometry.real_cell_size,
+            outline=options.CONTESTED_BORDER_COLOR,
+            width=options.CONTESTED_BORDER_WIDTH,
+            tags=CELL_IMAGE_TAG,
+        )
+
 
 def redraw():
     canvas.delete(CELL_TAG)
@@ -132,13 +176,26 @@ def redraw():
         )
     )
 
+    if state.lasso_points:
+        canvas.create_line(
+            *state.lasso_points,
+            *state.lasso_points[0],
+            fill=options.LASSO_OUTLINE_COLOR,
+            width=options.LASSO_OUTLINE_WIDTH,
+            tags=CELL_TAG,
+        )
+
+    if state.lasso_enabled:
+        return
+
     if not state.dragging:
+        geometry = state.geometry
         focused_cell = state.get_focused_state_by_cell()
         for x, y, cell_type in state.all_cells:
-            x0 = x * state.real_cell_size + state.real_offset_x
-            y0 = y * state.real_cell_size + state.real_offset_y
-            x1 = x0 + state.real_cell_size
-            y1 = y0 + state.real_cell_size
+            x0 = geometry.column_origins[x]
+            y0 = geometry.row_origins[y]
+            x1 = x0 + geometry.real_cell_size
+            y1 = y0 + geometry.real_cell_size
 
             if focused_cell[(x, y)]:
                 canvas.create_rectangle(
@@ -188,6 +245,8 @@ def transition_from_mouse(event):
         if event.num == 1:
             if event.type == tk.EventType.ButtonPress:
                 handle_transition((TransitionType.PRESS, (event.x, event.y)))
+            elif event.type == tk.EventType.ButtonRelease:
+                handle_transition((TransitionType.LASSO_RELEASE, (event.x, event.y)))
         elif event.num == 3:
             if event.type == tk.EventType.ButtonPress:
                 handle_transition((TransitionType.DRAG_GRID_PRESS, (event.x, event.y)))
@@ -212,6 +271,17 @@ def transition_from_key(event):
     if event.char == options.KEYBINDING_TOGGLE_KEY:
         handle_transition((TransitionType.TOGGLE_CELLS, None))
         adjust_brush_label()
+    elif (
+        event.char == options.KEYBINDING_LASSO_KEY
+        and event.type == tk.EventType.KeyPress
+    ):
+        handle_transition((TransitionType.TOGGLE_LASSO, None))
+        adjust_brush_label()
+    elif (
+        event.char == options.KEYBINDING_FLOOD_FILL_KEY
+        and event.type == tk.EventType.KeyPress
+    ):
+        handle_transition((TransitionType.FLOOD_FILL, None))
     elif event.char == "\x1a" or event.char == "u":
         # Ctrl-Z
         handle_transition((TransitionType.UNDO_CELLS, None))
@@ -269,9 +339,12 @@ HELP_TEXT = f"""\
 Help:
 - Press a/d to select the previous/next brush
 - Press {options.KEYBINDING_TOGGLE_KEY} to toggle cells
+- Press {options.KEYBINDING_LASSO_KEY} to toggle the lasso, release the mouse to fill it
+- Press {options.KEYBINDING_FLOOD_FILL_KEY} to fill the region under the pointer
 - Press Ctrl-z to undo and Ctrl-y to redo (only cell state for now)
 - Scroll to increase/decrease pointer size
 - Drag with the mouse right button to add offset to the cells
+- Run with --review to highlight the cells where annotators disagree
 """[
     :-1
 ]
@@ -284,9 +357,10 @@ fill_with_button = None
 
 def adjust_brush_label():
     color_disabled = "" if state.show_cells else "(cells are hidden)"
+    lasso = "(lasso)" if state.lasso_enabled else ""
 
     brush_rect.configure(background=options.CELL_COLORS[state.cell_brush])
-    brush_label.configure(text=f"{state.cell_brush.name}{color_disabled}")
+    brush_label.configure(text=f"{state.cell_brush.name}{lasso}{color_disabled}")
 
     fill_with_button.configure(text=f"Fill all with '{state.cell_brush.name}'")
 
@@ -20,6 +20,9 @@ CELL_BORDER_COLOR = "white"
 CELL_FOCUS_BORDER_WIDTH = 2
 CELL_FOCUS_BORDER_COLOR = "red"
 
+CONTESTED_BORDER_WIDTH = 3
+CONTESTED_BORDER_COLOR = "yellow"
+
 POINTER_SIZE_MIN = 30
 POINTER_SIZE_MAX = CELL_SIZE * 5
 POINTER_SIZE_INITIAL = POINTER_SIZE_MIN
@@ -27,17 +30,42 @@ POINTER_SIZE_INITIAL = POINTER_SIZE_MIN
 POINTER_OUTLINE_WIDTH = 2
 POINTER_SIZE_CHANGE_DELTA = 20
 
+# Samples per cell side when filling the lasso, 1 only checks the cell center
+LASSO_SAMPLES = 1
+# Fraction of the samples of a cell that must be inside the lasso to fill it
+LASSO_COVERAGE = 0.5
+LASSO_OUTLINE_WIDTH = 2
+LASSO_OUTLINE_COLOR = "red"
+
+# 4 or 8, whether diagonal cells are part of the same region when filling
+FLOOD_FILL_CONNECTIVITY = 4
+
 # Reduce the pointer radius a bit to avoid millimetric cell accidental selection
 REDUCE_RADIUS = 5
 
 BRUSH_INDICATOR_SIZE = 40
 
 KEYBINDING_TOGGLE_KEY = "f"
+KEYBINDING_LASSO_KEY = "l"
+KEYBINDING_FLOOD_FILL_KEY = "g"
 
 
 def parse_args():
     parser = ArgumentParser(description="Tag cells from an image")
     parser.add_argument("image", metavar="IMAGE", help="The image to tag")
+    parser.add_argument(
+        "-c",
+        "--cell-size",
+        help=f"Size of the cells, read from the cells file or {CELL_SIZE} by default",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-r",
+        "--review",
+        help="Highlight the cells where the annotators of the image disagree",
+        action="store_true",
+    )
     parser.add_argument(
         "-v", "--verbose", help="Print useful debug output", action="store_true"
     )
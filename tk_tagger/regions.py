@@ -0,0 +1,111 @@
+"""
+Connected regions of cells with the same type
+"""
+from typing import List, Mapping, Optional, Tuple
+
+import options
+from cell import CellType
+
+Coord = Tuple[int, int]
+Cells = Mapping[Coord, CellType]
+
+
+def _flat_types(cells: Cells, columns: int, rows: int) -> List[CellType]:
+    # Uses get so that the defaultdict is not filled with every missing cell
+    return [
+        cells.get((x, y), options.DEFAULT_CELL_COLOR)
+        for y in range(rows)
+        for x in range(columns)
+    ]
+
+
+def _flood(
+    types: List[CellType],
+    visited: bytearray,
+    start: int,
+    columns: int,
+    rows: int,
+    connectivity: int,
+) -> List[int]:
+    """
+    Flat indices of the region that contains start, marking them as visited
+    """
+    target = types[start]
+    region = []
+    stack = [start]
+    visited[start] = 1
+
+    while stack:
+        idx = stack.pop()
+        region.append(idx)
+
+        y, x = divmod(idx, columns)
+        west = x > 0
+        east = x < columns - 1
+        north = y > 0
+        south = y < rows - 1
+
+        neighbours = []
+        if west:
+            neighbours.append(idx - 1)
+        if east:
+            neighbours.append(idx + 1)
+        if north:
+            neighbours.append(idx - columns)
+        if south:
+            neighbours.append(idx + columns)
+
+        if connectivity == 8:
+            if north and west:
+                neighbours.append(idx - columns - 1)
+            if north and east:
+                neighbours.append(idx - columns + 1)
+            if south and west:
+                neighbours.append(idx + columns - 1)
+            if south and east:
+                neighbours.append(idx + columns + 1)
+
+        for n in neighbours:
+            if not visited[n] and types[n] == target:
+                visited[n] = 1
+                stack.append(n)
+
+    return region
+
+
+def connected_region(
+    cells: Cells, start: Coord, columns: int, rows: int, connectivity: int = 4
+) -> List[Coord]:
+    x, y = start
+    if not (0 <= x < columns and 0 <= y < rows):
+        return []
+
+    types = _flat_types(cells, columns, rows)
+    visited = bytearray(columns * rows)
+    region = _flood(types, visited, y * columns + x, columns, rows, connectivity)
+
+    return [(idx % columns, idx // columns) for idx in region]
+
+
+def connected_components(
+    cells: Cells,
+    columns: int,
+    rows: int,
+    connectivity: int = 4,
+    cell_type: Optional[CellType] = None,
+) -> List[Tuple[CellType, List[Coord]]]:
+    """
+    Every region of the grid with its type, only the ones of cell_type if given
+    """
+    types = _flat_types(cells, columns, rows)
+    visited = bytearray(columns * rows)
+    result = []
+
+    for start, t in enumerate(types):
+        if visited[start] or (cell_type is not None and t != cell_type):
+            continue
+
+        region = _flood(types, visited, start, columns, rows, connectivity)
+        result.append((t, [(idx % columns, idx // columns) for idx in region]))
+
+    return result
@@ -0,0 +1,274 @@
+"""
+Resample the cells of tagged images to a different cell size or offset
+
+Each new cell takes a type from the area of the old cells it overlaps, where
+the parts of it not covered by any old cell count as IGNORE. The overlaps are
+computed once per column and once per row, since the area of the overlap of
+two cells is the product of both.
+"""
+from argparse import ArgumentParser, ArgumentTypeError
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+import dataset
+import options
+from cell import CellType
+from state import CellStates
+import state_io
+
+RULE_MAJORITY = "majority"
+RULE_ANY_FIRE = "any-fire"
+RULE_COVERAGE = "coverage"
+RULES = [RULE_MAJORITY, RULE_ANY_FIRE, RULE_COVERAGE]
+
+
+def axis_overlaps(
+    old_offset: int,
+    old_size: int,
+    old_count: int,
+    new_offset: int,
+    new_size: int,
+    new_count: int,
+) -> List[List[Tuple[int, int]]]:
+    """
+    For each new cell along an axis, the old cells it overlaps with the length
+    of the overlap
+    """
+    result = []
+
+    for i in range(new_count):
+        start = new_offset + i * new_size
+        end = start + new_size
+
+        first = max(0, (start - old_offset) // old_size)
+        last = min(old_count, -(-(end - old_offset) // old_size))
+
+        overlaps = []
+        for j in range(first, last):
+            old_start = old_offset + j * old_size
+            length = min(end, old_start + old_size) - max(start, old_start)
+            if length > 0:
+                overlaps.append((j, length))
+
+        result.append(overlaps)
+
+    return result
+
+
+def choose(areas: Counter, total: int, rule: str, min_coverage: float) -> CellType:
+    if rule == RULE_ANY_FIRE and areas[CellType.FIRE] > 0:
+        return CellType.FIRE
+
+    if rule == RULE_COVERAGE:
+        labeled = [t for t in CellType if t != CellType.IGNORE]
+        best = max(labeled, key=lambda t: areas[t])
+        return best if areas[best] / total >= min_coverage else CellType.IGNORE
+
+    # Ties are resolved in favour of the first type
+    return max(CellType, key=lambda t: areas[t])
+
+
+def resample(
+    cells: CellStates,
+    old_offset: Tuple[int, int],
+    old_size: int,
+    old_shape: Tuple[int, int],
+    new_offset: Tuple[int, int],
+    new_size: int,
+    new_shape: Tuple[int, int],
+    rule: str = RULE_MAJORITY,
+    min_coverage: float = 0.5,
+) -> CellStates:
+    old_columns, old_rows = old_shape
+    new_columns, new_rows = new_shape
+
+    column_overlaps = axis_overlaps(
+        old_offset[0], old_size, old_columns, new_offset[0], new_size, new_columns
+    )
+    row_overlaps = axis_overlaps(
+        old_offset[1], old_size, old_rows, new_offset[1], new_size, new_rows
+    )
+
+    total = new_size * new_size
+    result = CellStates()
+
+    for row, rows in enumerate(row_overlaps):
+        for column, columns in enumerate(column_overlaps):
+            areas = Counter()
+            for old_row, height in rows:
+                for old_column, width in columns:
+                    t = cells.get((old_column, old_row), options.DEFAULT_CELL_COLOR)
+                    areas[t] += width * height
+
+            areas[CellType.IGNORE] += total - sum(areas.values())
+            result[(column, row)] = choose(areas, total, rule, min_coverage)
+
+    return result
+
+
+def regrid_image(
+    image: Path,
+    cells_file: Path,
+    target: Path,
+    new_size: int,
+    new_offset: Tuple[Optional[int], Optional[int]],
+    rule: str,
+    min_coverage: float,
+) -> Path:
+    offset_x, offset_y, cells, old_size = state_io.read_cells(cells_file)
+    old_size = old_size or options.CELL_SIZE
+
+    with Image.open(image) as src:
+        width, height = src.size
+
+    new_x, new_y = new_offset
+    # The offset can't move the grid out of the image
+    new_x = max(0, min(offset_x if new_x is None else new_x, width % new_size))
+    new_y = max(0, min(offset_y if new_y is None else new_y, height % new_size))
+    new_shape = dataset.grid_shape(width, height, new_size)
+
+    result = resample(
+        cells,
+        (offset_x, offset_y),
+        old_size,
+        dataset.grid_shape(width, height, old_size),
+        (new_x, new_y),
+        new_size,
+        new_shape,
+        rule,
+        min_coverage,
+    )
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    state_io.write_cell_states(target, new_x, new_y, new_size, *new_shape, result)
+    return target
+
+
+def positive_int(value: str) -> int:
+    result = int(value)
+    if result <= 0:
+        raise ArgumentTypeError(f"{value} is not a positive integer")
+    return result
+
+
+def non_negative_int(value: str) -> int:
+    result = int(value)
+    if result < 0:
+        raise ArgumentTypeError(f"{value} is not a non negative integer")
+    return result
+
+
+def parse_args():
+    parser = ArgumentParser(description="Resample cells to a new cell size or offset")
+    parser.add_argument(
+        "inputs", metavar="INPUT", nargs="+", help="Images or directories of images"
+    )
+    parser.add_argument(
+        "--cell-size",
+        type=positive_int,
+        required=True,
+        help="The new size of the cells",
+    )
+    parser.add_argument(
+        "--offset-x",
+        type=non_negative_int,
+        default=None,
+        help="The new offset, kept by default",
+    )
+    parser.add_argument(
+        "--offset-y",
+        type=non_negative_int,
+        default=None,
+        help="The new offset, kept by default",
+    )
+    parser.add_argument(
+        "--rule",
+        choices=RULES,
+        default=RULE_MAJORITY,
+        help="How to pick the type of each new cell from the old ones",
+    )
+    parser.add_argument(
+        "--min-coverage",
+        type=float,
+        default=0.5,
+        help="Fraction of a new cell a type must cover with the coverage rule",
+    )
+
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "-o", "--output", default=None, help="Directory to write the new files to"
+    )
+    target.add_argument(
+        "--in-place", action="store_true", help="Replace the existing cells files"
+    )
+
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+
+    return parser.parse_args()
+
+
+def output_targets(
+    inputs: List[str], output: Optional[Path]
+) -> List[Tuple[Path, Path, Path]]:
+    """
+    The images with their cells file and the file to write. Inside the output
+    directory, the files keep their path relative to the input they were found in
+    """
+    result = []
+    targets = {}
+
+    for root in map(Path, inputs):
+        base = root.parent if root.is_file() else root
+
+        for image, cells_file in dataset.find_tagged_images([root]):
+            target = output / cells_file.relative_to(base) if output else cells_file
+
+            if target in targets:
+                raise ValueError(
+                    f"{cells_file} and {targets[target]} would both be written "
+                    f"to {target}"
+                )
+            targets[target] = cells_file
+
+            result.append((image, cells_file, target))
+
+    return result
+
+
+def main():
+    args = parse_args()
+    output = None if args.in_place else Path(args.output)
+
+    try:
+        images = output_targets(args.inputs, output)
+    except ValueError as e:
+        exit(str(e))
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [
+            executor.submit(
+                regrid_image,
+                image,
+                cells_file,
+                target,
+                args.cell_size,
+                (args.offset_x, args.offset_y),
+                args.rule,
+                args.min_coverage,
+            )
+            for image, cells_file, target in images
+        ]
+
+        for future in futures:
+            print(future.result())
+
+
+if __name__ == "__main__":
+    main()
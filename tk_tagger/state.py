@@ -4,10 +4,11 @@ State handler
 
 from enum import Enum, auto
 from collections import defaultdict
-from typing import Any, DefaultDict, Tuple
+from typing import Any, DefaultDict, List, NamedTuple, Set, Tuple
 
 import options
 import geom
+import regions
 from cell import CellType
 from undo_redo import UndoRedo
 
@@ -31,6 +32,11 @@ class TransitionType(Enum):
     DRAG_GRID_PRESS = auto()
     DRAG_GRID_RELEASE = auto()
 
+    TOGGLE_LASSO = auto()
+    LASSO_RELEASE = auto()
+
+    FLOOD_FILL = auto()
+
 
 Transition = Tuple[TransitionType, Any]
 
@@ -43,6 +49,28 @@ class CellStates(DefaultDict[Coord, CellType]):
         self.default_factory = lambda: options.DEFAULT_CELL_COLOR
 
 
+class Geometry(NamedTuple):
+    """
+    Values derived from the image size, the offset and the cell size, only
+    recomputed when any of those change
+    """
+
+    width_ratio: float
+    height_ratio: float
+    inverse_width_ratio: float
+    inverse_height_ratio: float
+    real_cell_size: float
+    real_offset_x: float
+    real_offset_y: float
+    max_offset_x: int
+    max_offset_y: int
+    rows: int
+    columns: int
+    # Real coordinates of the top/left border of each column/row
+    column_origins: List[float]
+    row_origins: List[float]
+
+
 class StateData:
     def __init__(
         self, cell_size: int, initial_image_width: int, initial_image_height: int
@@ -51,8 +79,12 @@ class StateData:
 
         self.cell_brush = CellType.FIRE
         self.show_cells = True
+        self.contested_cells: Set[Coord] = set()
 
-        self.cell_size = cell_size
+        self.lasso_enabled = False
+        self.lasso_points: List[Tuple[float, float]] = []
+
+        self._cell_size = cell_size
         self.cell_width = cell_size
         self.cell_height = cell_size
 
@@ -62,8 +94,9 @@ class StateData:
         self.real_image_width = 100
         self.real_image_height = 100
 
-        self.offset_x = 0
-        self.offset_y = 0
+        self._offset_x = 0
+        self._offset_y = 0
+        self.update_geometry()
 
         self.mouse_x = 0
         self.mouse_y = 0
@@ -89,6 +122,65 @@ class StateData:
 
         return cells
 
+    def update_geometry(self):
+        width_ratio = self.real_image_width / self.initial_image_width
+        height_ratio = self.real_image_height / self.initial_image_height
+
+        # The cells are squares, so they scale only with the width
+        real_cell_size = width_ratio * self.cell_size
+        real_offset_x = self.offset_x * width_ratio
+        real_offset_y = self.offset_y * height_ratio
+
+        rows = self.initial_image_height // self.cell_size
+        columns = self.initial_image_width // self.cell_size
+
+        self.geometry = Geometry(
+            width_ratio=width_ratio,
+            height_ratio=height_ratio,
+            inverse_width_ratio=self.initial_image_width / self.real_image_width,
+            inverse_height_ratio=self.initial_image_height / self.real_image_height,
+            real_cell_size=real_cell_size,
+            real_offset_x=real_offset_x,
+            real_offset_y=real_offset_y,
+            max_offset_x=self.initial_image_width % self.cell_size,
+            max_offset_y=self.initial_image_height % self.cell_size,
+            rows=rows,
+            columns=columns,
+            column_origins=[
+                x * real_cell_size + real_offset_x for x in range(columns + 1)
+            ],
+            row_origins=[y * real_cell_size + real_offset_y for y in range(rows + 1)],
+        )
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    @cell_size.setter
+    def cell_size(self, value):
+        self._cell_size = value
+        self.cell_width = value
+        self.cell_height = value
+        self.update_geometry()
+
+    @property
+    def offset_x(self):
+        return self._offset_x
+
+    @offset_x.setter
+    def offset_x(self, value):
+        self._offset_x = value
+        self.update_geometry()
+
+    @property
+    def offset_y(self):
+        return self._offset_y
+
+    @offset_y.setter
+    def offset_y(self, value):
+        self._offset_y = value
+        self.update_geometry()
+
     @property
     def cell_state(self):
         return self.cell_state_handler.current
@@ -99,11 +191,11 @@ class StateData:
 
     @property
     def real_offset_x(self):
-        return self.offset_x * self.width_ratio
+        return self.geometry.real_offset_x
 
     @property
     def real_offset_y(self):
-        return self.offset_y * self.height_ratio
+        return self.geometry.real_offset_y
 
     @property
     def pointer_cell(self):
@@ -122,43 +214,43 @@ class StateData:
 
     @property
     def inverse_height_ratio(self):
-        return self.initial_image_height / self.real_image_height
+        return self.geometry.inverse_height_ratio
 
     @property
     def inverse_width_ratio(self):
-        return self.initial_image_width / self.real_image_width
+        return self.geometry.inverse_width_ratio
 
     @property
     def width_ratio(self):
-        return self.real_image_width / self.initial_image_width
+        return self.geometry.width_ratio
 
     @property
     def height_ratio(self):
-        return self.real_image_height / self.initial_image_height
+        return self.geometry.height_ratio
 
     @property
     def size_ratio(self):
-        return self.real_image_width / self.initial_image_width
+        return self.geometry.width_ratio
 
     @property
     def real_cell_size(self):
-        return self.size_ratio * self.cell_size
+        return self.geometry.real_cell_size
 
     @property
     def max_offset_x(self):
-        return self.initial_image_width % self.cell_size
+        return self.geometry.max_offset_x
 
     @property
     def max_offset_y(self):
-        return self.initial_image_height % self.cell_size
+        return self.geometry.max_offset_y
 
     @property
     def rows(self):
-        return self.initial_image_height // self.cell_size
+        return self.geometry.rows
 
     @property
     def columns(self):
-        return self.initial_image_width // self.cell_size
+        return self.geometry.columns
 
     @property
     def all_cells(self):
@@ -168,12 +260,25 @@ class StateData:
 
     @property
     def all_real_cells(self):
+        column_origins = self.geometry.column_origins
+        row_origins = self.geometry.row_origins
+
         for (x, y, state) in self.all_cells:
-            yield (
-                x * self.real_cell_size + self.real_offset_x,
-                y * self.real_cell_size + self.real_offset_y,
-                state,
-            )
+            yield column_origins[x], row_origins[y], state
+
+    def get_lasso_cells(self):
+        return geom.get_polygon_grid_cells(
+            [
+                (x - self.real_offset_x, y - self.real_offset_y)
+                for x, y in self.lasso_points
+            ],
+            self.real_cell_size,
+            self.real_cell_size,
+            self.columns,
+            self.rows,
+            options.LASSO_SAMPLES,
+            options.LASSO_COVERAGE,
+        )
 
     def update_cell_state(self, new_state: CellStates):
         self.cell_state_handler.push(new_state)
@@ -191,7 +296,32 @@ class StateData:
             self.mouse_y = mouse_y
 
         if not self.dragging:
-            if ttype == TransitionType.DRAG or ttype == TransitionType.PRESS:
+            if self.lasso_enabled and ttype == TransitionType.PRESS:
+                self.lasso_points = [data]
+            elif self.lasso_enabled and ttype == TransitionType.DRAG:
+                self.lasso_points.append(data)
+            elif ttype == TransitionType.LASSO_RELEASE:
+                # A click leaves less than 3 points, which can't be filled
+                changed = []
+                if len(self.lasso_points) >= 3:
+                    changed = [
+                        coords
+                        for coords in self.get_lasso_cells()
+                        if self.cell_state.get(coords, options.DEFAULT_CELL_COLOR)
+                        != self.cell_brush
+                    ]
+                self.lasso_points = []
+
+                if changed:
+                    new_state = self.cell_state.copy()
+                    for coords in changed:
+                        new_state[coords] = self.cell_brush
+
+                    self.update_cell_state(new_state)
+            elif ttype == TransitionType.TOGGLE_LASSO:
+                self.lasso_enabled = not self.lasso_enabled
+                self.lasso_points = []
+            elif ttype == TransitionType.DRAG or ttype == TransitionType.PRESS:
                 focused_cells = self.get_focused_state_by_cell()
                 new_state = self.cell_state.copy()
 
@@ -217,6 +347,7 @@ class StateData:
                 self.show_cells = not self.show_cells
             elif ttype == TransitionType.RESIZE_IMAGE:
                 self.real_image_width, self.real_image_height = data
+                self.update_geometry()
             elif ttype == TransitionType.RESET_CELLS:
                 self.update_cell_state(CellStates())
             elif (
@@ -236,6 +367,26 @@ class StateData:
                     }
                 )
                 self.update_cell_state(new_state)
+            elif ttype == TransitionType.FLOOD_FILL:
+                start = self.pointer_cell
+                start_type = self.cell_state.get(start, options.DEFAULT_CELL_COLOR)
+                # A region that already has the brush would push an equal state
+                if start_type == self.cell_brush:
+                    return
+
+                region = regions.connected_region(
+                    self.cell_state,
+                    start,
+                    self.columns,
+                    self.rows,
+                    options.FLOOD_FILL_CONNECTIVITY,
+                )
+                if region:
+                    new_state = self.cell_state.copy()
+                    for coords in region:
+                        new_state[coords] = self.cell_brush
+
+                    self.update_cell_state(new_state)
             elif ttype == TransitionType.DRAG_GRID_PRESS:
                 sx, sy = data
 
@@ -249,8 +400,9 @@ class StateData:
                 sx, sy = self.dragging_start
                 x, y = data
 
-                self.offset_x = int((x - sx) * self.inverse_width_ratio)
-                self.offset_y = int((y - sy) * self.inverse_height_ratio)
+                offset_x = int((x - sx) * self.inverse_width_ratio)
+                offset_y = int((y - sy) * self.inverse_height_ratio)
 
-                self.offset_x = max(0, min(self.offset_x, self.max_offset_x))
-                self.offset_y = max(0, min(self.offset_y, self.max_offset_y))
+                self._offset_x = max(0, min(offset_x, self.max_offset_x))
+                self._offset_y = max(0, min(offset_y, self.max_offset_y))
+                self.update_geometry()
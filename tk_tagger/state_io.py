@@ -1,24 +1,51 @@
 from pathlib import Path
 import re
-from typing import Tuple
+from typing import Optional, Tuple
 from state import CellStates, CellType, StateData
 
 
 def write_cells(target: Path, state: StateData):
+    write_cell_states(
+        target,
+        state.offset_x,
+        state.offset_y,
+        state.cell_size,
+        state.columns,
+        state.rows,
+        state.cell_state,
+    )
+
+
+def write_cell_states(
+    target: Path,
+    offset_x: int,
+    offset_y: int,
+    cell_size: int,
+    columns: int,
+    rows: int,
+    cells: CellStates,
+):
     with open(target, "w") as f:
-        f.write(f"offset,{state.offset_x},{state.offset_y}\n")
-        for row in range(state.rows):
-            for col in range(state.columns):
-                f.write(f"{row},{col},{state.cell_state[(col, row)].name}\n")
+        f.write(f"offset,{offset_x},{offset_y}\n")
+        f.write(f"cell_size,{cell_size}\n")
+        for row in range(rows):
+            for col in range(columns):
+                f.write(f"{row},{col},{cells[(col, row)].name}\n")
 
 
 OFFSET_LINE_RE = re.compile(r"offset,(?P<offset_x>\d+),(?P<offset_y>\d+)")
+CELL_SIZE_LINE_RE = re.compile(r"cell_size,(?P<cell_size>\d+)")
 CELL_LINE_RE = re.compile(r"(?P<row>\d+),(?P<column>\d+),(?P<type>\w+)")
 
 
-def read_cells(target: Path) -> Tuple[int, int, CellStates]:
+def read_cells(target: Path) -> Tuple[int, int, CellStates, Optional[int]]:
+    """
+    Read the offset, the cells and the cell size, which is None for files
+    written before it was stored
+    """
     offset_x = 0
     offset_y = 0
+    cell_size = None
     result = CellStates()
 
     with open(target, "r") as f:
@@ -36,5 +63,7 @@ def read_cells(target: Path) -> Tuple[int, int, CellStates]:
 
                 offset_x = int(g["offset_x"])
                 offset_y = int(g["offset_y"])
+            elif m := CELL_SIZE_LINE_RE.match(line):
+                cell_size = int(m.group("cell_size"))
 
-    return offset_x, offset_y, result
+    return offset_x, offset_y, result, cell_size
@@ -0,0 +1,256 @@
+"""
+Dataset statistics aggregated over many cells files
+
+The statistics of each cells file are cached by modification time and size, so
+rerunning after adding some images only parses the new or changed files. Grids
+with different cell sizes don't line up, so there is a heatmap per cell size.
+"""
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+import dataset
+import options
+from cell import CellType
+import regions
+import state_io
+
+CACHE_VERSION = 3
+CACHE_NAME = "stats-cache.json"
+
+HEATMAP_TYPE = CellType.FIRE
+HEATMAP_NAME = "heatmap-{}.png"
+
+
+def file_stats(cells_file: Path) -> Dict:
+    _, _, cells, cell_size = state_io.read_cells(cells_file)
+    columns, rows = 0, 0
+    if cells:
+        columns = max(c for c, _ in cells) + 1
+        rows = max(r for _, r in cells) + 1
+
+    counts = Counter(t.name for t in cells.values())
+    heatmap_regions = regions.connected_components(
+        cells, columns, rows, cell_type=HEATMAP_TYPE
+    )
+
+    return {
+        "cell_size": cell_size or options.CELL_SIZE,
+        "columns": columns,
+        "rows": rows,
+        "counts": {t.name: counts[t.name] for t in CellType},
+        "heatmap": sorted(
+            list(coord) for coord, t in cells.items() if t == HEATMAP_TYPE
+        ),
+        "regions": len(heatmap_regions),
+        "largest_region": max((len(r) for _, r in heatmap_regions), default=0),
+    }
+
+
+def density(stats: Dict) -> float:
+    total = stats["columns"] * stats["rows"]
+    if not total:
+        return 0.0
+    return 1 - stats["counts"][CellType.IGNORE.name] / total
+
+
+class Heatmap:
+    def __init__(self):
+        self.images = 0
+        self.cells = Counter()
+        self.columns = 0
+        self.rows = 0
+
+    def add(self, stats: Dict):
+        self.images += 1
+        self.cells.update(tuple(coord) for coord in stats["heatmap"])
+        self.columns = max(self.columns, stats["columns"])
+        self.rows = max(self.rows, stats["rows"])
+
+    def image(self, scale: int) -> Image.Image:
+        peak = max(self.cells.values(), default=0) or 1
+
+        heatmap = Image.new("L", (max(self.columns, 1), max(self.rows, 1)))
+        heatmap.putdata(
+            [
+                int(255 * self.cells[(column, row)] / peak)
+                for row in range(heatmap.height)
+                for column in range(heatmap.width)
+            ]
+        )
+
+        return heatmap.resize(
+            (heatmap.width * scale, heatmap.height * scale), Image.NEAREST
+        )
+
+
+class Aggregate:
+    def __init__(self):
+        self.images = 0
+        self.counts = Counter()
+        self.heatmaps: Dict[int, Heatmap] = defaultdict(Heatmap)
+
+    def add(self, stats: Dict):
+        self.images += 1
+        self.counts.update(stats["counts"])
+        self.heatmaps[stats["cell_size"]].add(stats)
+
+    def summary(self) -> Dict:
+        return {
+            "images": self.images,
+            "counts": {t.name: self.counts[t.name] for t in CellType},
+            "heatmap_type": HEATMAP_TYPE.name,
+            "grids": {
+                cell_size: {
+                    "images": heatmap.images,
+                    "columns": heatmap.columns,
+                    "rows": heatmap.rows,
+                    "heatmap": HEATMAP_NAME.format(cell_size),
+                }
+                for cell_size, heatmap in sorted(self.heatmaps.items())
+            },
+        }
+
+
+def load_cache(path: Path) -> Dict:
+    if not path.exists():
+        return {}
+
+    with open(path, "r") as f:
+        cache = json.load(f)
+
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+
+    return cache["files"]
+
+
+def save_cache(path: Path, files: Dict):
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "w") as f:
+        json.dump({"version": CACHE_VERSION, "files": files}, f)
+    partial.replace(path)
+
+
+def collect(cells_files: List[Path], cache: Dict, jobs: int) -> Dict:
+    """
+    Statistics of every cells file, only parsing the ones that are not cached
+    """
+    result = {}
+    stale = []
+
+    for cells_file in cells_files:
+        key = str(cells_file.absolute())
+        info = cells_file.stat()
+        entry = cache.get(key)
+
+        if (
+            entry
+            and entry["mtime_ns"] == info.st_mtime_ns
+            and entry["size"] == info.st_size
+        ):
+            result[key] = entry
+        else:
+            stale.append((key, cells_file, info))
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            parsed = executor.map(
+                file_stats, [cells_file for _, cells_file, _ in stale], chunksize=64
+            )
+            for (key, _, info), stats in zip(stale, parsed):
+                result[key] = {
+                    "mtime_ns": info.st_mtime_ns,
+                    "size": info.st_size,
+                    "stats": stats,
+                }
+
+    print(f"Parsed {len(stale)} of {len(cells_files)} cells files")
+    return result
+
+
+def write_images_csv(target: Path, files: Dict):
+    with open(target, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "cells_file",
+                "cell_size",
+                "columns",
+                "rows",
+                *(t.name for t in CellType),
+                "density",
+                f"{HEATMAP_TYPE.name}_regions",
+                f"largest_{HEATMAP_TYPE.name}_region",
+            ]
+        )
+        for key, entry in sorted(files.items()):
+            stats = entry["stats"]
+            writer.writerow(
+                [
+                    key,
+                    stats["cell_size"],
+                    stats["columns"],
+                    stats["rows"],
+                    *(stats["counts"][t.name] for t in CellType),
+                    f"{density(stats):.4f}",
+                    stats["regions"],
+                    stats["largest_region"],
+                ]
+            )
+
+
+def parse_args():
+    parser = ArgumentParser(description="Aggregate statistics of tagged images")
+    parser.add_argument(
+        "inputs", metavar="INPUT", nargs="+", help="Images or directories of images"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Directory to write the statistics to"
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help=f"Cache file, defaults to {CACHE_NAME} in the output directory",
+    )
+    parser.add_argument(
+        "--heatmap-scale", type=int, default=10, help="Heatmap pixels per cell"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    cache_path = Path(args.cache) if args.cache else output / CACHE_NAME
+
+    cells_files = [c for _, c in dataset.find_tagged_images(args.inputs)]
+    files = collect(cells_files, load_cache(cache_path), args.jobs)
+    save_cache(cache_path, files)
+
+    aggregate = Aggregate()
+    for entry in files.values():
+        aggregate.add(entry["stats"])
+
+    with open(output / "summary.json", "w") as f:
+        json.dump(aggregate.summary(), f, indent=2)
+
+    write_images_csv(output / "images.csv", files)
+    for cell_size, heatmap in aggregate.heatmaps.items():
+        heatmap.image(args.heatmap_scale).save(output / HEATMAP_NAME.format(cell_size))
+
+
+if __name__ == "__main__":
+    main()